@@ -1,10 +1,26 @@
 import yaml
+import argparse
 import json
 import os
 import re
+import sqlite3
+
+from profiler import Profiler
 
 NEXO_DIR = 'nexo-items'
 OUTPUT_FILE = 'items.json'
+ASSETS_DIR = 'assets'
+ASSET_REPORT_FILE = 'assets_report.json'
+DB_FILE = 'items.db'
+
+ASSET_FOLDERS = {
+    'models': '.json',
+    'textures': '.png'
+}
+
+PROFILER = Profiler('nexo-items')
+
+VANILLA_PARENTS = {'item/generated', 'item/handheld', 'item/handheld_rod'}
 
 REQUIRED_CATEGORIES = [
     'equipment', 'relics', 'materials', 'blocks', 'food', 'misc', 'plants'
@@ -64,31 +80,108 @@ def extract_custom_model(item_data):
             model_raw = comps['parent_model']
 
     if model_raw:
-        clean_path = model_raw.split(':', 1)[1] if ':' in model_raw else model_raw
-        
-        if '/' in clean_path:
-            final_path = f"assets/models/{clean_path}"
-        else:
-            final_path = f"assets/models/item/{clean_path}"
-
-        if not final_path.endswith('.json'):
-            final_path += '.json'
-            
-        return final_path
+        return model_ref_to_path(model_raw)
 
     return ""
 
-def get_model_details(model_path):
+def model_ref_to_path(model_raw):
+    clean_path = model_raw.split(':', 1)[1] if ':' in model_raw else model_raw
+    
+    if '/' in clean_path:
+        final_path = f"assets/models/{clean_path}"
+    else:
+        final_path = f"assets/models/item/{clean_path}"
+
+    if not final_path.endswith('.json'):
+        final_path += '.json'
+        
+    return final_path
+
+def collect_pack_refs(pack):
+    refs = []
+    if not isinstance(pack, dict):
+        return refs
+
+    for key, value in pack.items():
+        if key == 'parent_model':
+            kind = 'parent'
+        elif key.endswith('model') or key.endswith('models'):
+            kind = 'model'
+        elif key.endswith('texture') or key.endswith('textures'):
+            kind = 'texture'
+        else:
+            continue
+
+        if isinstance(value, dict):
+            values = value.values()
+        elif isinstance(value, list):
+            values = value
+        else:
+            values = [value]
+
+        for raw in values:
+            if isinstance(raw, str) and raw:
+                refs.append((kind, raw, f"Pack.{key}"))
+    return refs
+
+def scan_assets(root=ASSETS_DIR):
+    index = {}
+    if not os.path.isdir(root):
+        return index
+
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        path = entry.path.replace(os.sep, '/')
+                        index[path] = {"size": st.st_size, "mtime": st.st_mtime}
+        except OSError as e:
+            print(f"Error scanning {current}: {e}")
+
+    return index
+
+def asset_exists(path, asset_index=None):
+    if not path:
+        return False
+    if asset_index is None:
+        return os.path.exists(path)
+    return path in asset_index
+
+_model_cache = {}
+
+def load_model(model_path, asset_index=None):
+    if model_path in _model_cache:
+        return _model_cache[model_path]
+
+    model_json = None
+    if asset_exists(model_path, asset_index):
+        try:
+            with open(model_path, 'r', encoding='utf-8') as f:
+                model_json = json.load(f)
+        except Exception as e:
+            print(f"Error reading model {model_path}: {e}")
+
+    _model_cache[model_path] = model_json
+    return model_json
+
+def get_model_details(model_path, asset_index=None):
     texture_res = ""
     parent_res = ""
 
-    if not model_path or not os.path.exists(model_path):
+    if not asset_exists(model_path, asset_index):
+        return "", ""
+
+    model_json = load_model(model_path, asset_index)
+    if not isinstance(model_json, dict):
         return "", ""
 
     try:
-        with open(model_path, 'r', encoding='utf-8') as f:
-            model_json = json.load(f)
-        
         if 'parent' in model_json:
             raw_parent = model_json['parent']
             clean_parent = raw_parent.split(':', 1)[1] if ':' in raw_parent else raw_parent
@@ -115,6 +208,97 @@ def get_model_details(model_path):
 
     return texture_res, parent_res
 
+def classify_unresolved_ref(raw):
+    if raw.startswith('minecraft:') or raw.startswith('builtin/') or raw in VANILLA_PARENTS:
+        return None
+    if ':' not in raw:
+        return 'unresolved_vanilla'
+    return 'missing'
+
+def ref_to_asset_path(raw, folder):
+    clean = raw.split(':', 1)[1] if ':' in raw else raw
+    path = f"{ASSETS_DIR}/{folder}/{clean}"
+    ext = ASSET_FOLDERS[folder]
+    if not path.endswith(ext):
+        path += ext
+    return path
+
+def validate_assets(global_storage, asset_index):
+    unresolved = {"missing": [], "unresolved_vanilla": []}
+    referenced = set()
+    seen_items = set()
+
+    # raw is None for refs declared by the item itself, which always point into the pack
+    def check(item_id, kind, path, source, raw=None):
+        if (item_id, path) in checked: return
+        checked.add((item_id, path))
+
+        if path in asset_index:
+            referenced.add(path)
+            return
+        bucket = 'missing' if raw is None else classify_unresolved_ref(raw)
+        if bucket:
+            unresolved[bucket].append({"item": item_id, "kind": kind, "path": path, "source": source})
+
+    def check_model_chain(item_id, model_path):
+        visited = set()
+        while model_path and model_path not in visited:
+            visited.add(model_path)
+            model_json = load_model(model_path, asset_index)
+            if not isinstance(model_json, dict): break
+
+            textures = model_json.get('textures', {})
+            if isinstance(textures, dict):
+                for raw in textures.values():
+                    if not isinstance(raw, str) or raw.startswith('#'): continue
+                    check(item_id, 'texture', ref_to_asset_path(raw, 'textures'),
+                          model_path, raw=raw)
+
+            raw_parent = model_json.get('parent')
+            if not isinstance(raw_parent, str): break
+            parent_path = ref_to_asset_path(raw_parent, 'models')
+            check(item_id, 'parent', parent_path, model_path, raw=raw_parent)
+            model_path = parent_path
+
+    checked = set()
+    for items in global_storage.values():
+        for item in items:
+            item_id = item['id']
+            if item_id in seen_items: continue
+            seen_items.add(item_id)
+
+            for kind, raw, source in collect_pack_refs(item['Pack']):
+                if kind == 'texture':
+                    check(item_id, kind, ref_to_asset_path(raw, 'textures'), source)
+                elif kind == 'parent':
+                    parent_path = ref_to_asset_path(raw, 'models')
+                    check(item_id, kind, parent_path, source, raw=raw)
+                    check_model_chain(item_id, parent_path)
+                else:
+                    model_path = model_ref_to_path(raw)
+                    check(item_id, kind, model_path, source)
+                    check_model_chain(item_id, model_path)
+
+            if item['customModel']:
+                check(item_id, 'model', item['customModel'], 'Components')
+                check_model_chain(item_id, item['customModel'])
+
+    unused = []
+    for path in sorted(asset_index):
+        for folder, ext in ASSET_FOLDERS.items():
+            if path.startswith(f"{ASSETS_DIR}/{folder}/") and path.endswith(ext):
+                if path not in referenced:
+                    unused.append(path)
+                break
+
+    return {
+        "scanned": len(asset_index),
+        "referenced": len(referenced),
+        "missing": unresolved['missing'],
+        "unresolved_vanilla": unresolved['unresolved_vanilla'],
+        "unused": unused
+    }
+
 def clean_technical_tags(text):
     text = re.sub(r'<shift:[^>]+>', '', text)
     text = re.sub(r'<glyph:[^>]+>', '', text)
@@ -243,7 +427,7 @@ def get_mechanics(item_data):
 
     return mechs
 
-def process_files(global_storage):
+def process_files(global_storage, asset_index=None):
     if not os.path.exists(NEXO_DIR):
         print(f"Dir {NEXO_DIR} not found")
         return
@@ -254,80 +438,200 @@ def process_files(global_storage):
         filepath = os.path.join(NEXO_DIR, filename)
         print(f"Processing {filename}...")
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            try:
-                data = yaml.safe_load(f)
-            except yaml.YAMLError as e:
-                print(f"Error reading {filename}: {e}")
-                continue
+        with PROFILER.span('yaml_load', 'generator', file=filename):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                try:
+                    data = yaml.safe_load(f)
+                except yaml.YAMLError as e:
+                    print(f"Error reading {filename}: {e}")
+                    continue
 
         if not data: continue
 
-        for item_id, item_data in data.items():
-            if not isinstance(item_data, dict) or 'itemname' not in item_data: continue
+        with PROFILER.span('convert_items', 'generator', file=filename) as span_args:
+            converted = 0
+
+            for item_id, item_data in data.items():
+                if not isinstance(item_data, dict) or 'itemname' not in item_data: continue
 
-            raw_lore = item_data.get('lore', [])
-            glyph_tags = extract_glyph_tags_from_list(raw_lore)
+                raw_lore = item_data.get('lore', [])
+                glyph_tags = extract_glyph_tags_from_list(raw_lore)
             
-            categories = []
-            for tag in glyph_tags:
-                if tag in TAG_TO_CATEGORY:
-                    categories.append(TAG_TO_CATEGORY[tag])
+                categories = []
+                for tag in glyph_tags:
+                    if tag in TAG_TO_CATEGORY:
+                        categories.append(TAG_TO_CATEGORY[tag])
             
-            if not categories:
-                if 'block' in filename: categories = ['blocks']
-                elif 'food' in filename: categories = ['food']
-                else: categories = ['misc']
-
-            parsed_lore = []
-            for line in raw_lore:
-                parsed_line = parse_lore_line_to_html(line)
-                if parsed_line:
-                    parsed_lore.append(parsed_line)
-
-            custom_texture = extract_custom_texture(item_data)
-            custom_model = extract_custom_model(item_data)
+                if not categories:
+                    if 'block' in filename: categories = ['blocks']
+                    elif 'food' in filename: categories = ['food']
+                    else: categories = ['misc']
+
+                parsed_lore = []
+                for line in raw_lore:
+                    parsed_line = parse_lore_line_to_html(line)
+                    if parsed_line:
+                        parsed_lore.append(parsed_line)
+
+                custom_texture = extract_custom_texture(item_data)
+                custom_model = extract_custom_model(item_data)
             
-            model_texture = ""
-            parent_model = ""
-            if custom_model:
-                model_texture, parent_model = get_model_details(custom_model)
-
-            raw_name = item_data.get('itemname', item_id)
-            clean_name = clean_item_name(raw_name)
-
-            item_obj = {
-                "id": item_id,
-                "name": clean_name,
-                "type": item_data.get('material', 'UNKNOWN'),
-                "description": get_description(parsed_lore),
-                "rarity": item_data.get('Components', {}).get('rarity', 'COMMON'),
-                "icon": ICON_MAP.get(item_data.get('material'), 'box'),
-                "customIcon": custom_texture,
-                "customModel": custom_model,
-                "customModelTexture": model_texture,
-                "parentmodel": parent_model,
-                "lore": parsed_lore,
-                "mechanics": get_mechanics(item_data),
-                "glyph_tags": glyph_tags,
-                "image": "",
-                "Pack": item_data.get('Pack', {}),
-                "Components": item_data.get('Components', {})
-            }
-
-            for cat in categories:
-                if cat in global_storage:
-                    global_storage[cat].append(item_obj)
-                elif 'misc' in global_storage:
-                    global_storage['misc'].append(item_obj)
-
-def main():
+                model_texture = ""
+                parent_model = ""
+                if custom_model:
+                    model_texture, parent_model = get_model_details(custom_model, asset_index)
+
+                raw_name = item_data.get('itemname', item_id)
+                clean_name = clean_item_name(raw_name)
+
+                item_obj = {
+                    "id": item_id,
+                    "name": clean_name,
+                    "type": item_data.get('material', 'UNKNOWN'),
+                    "description": get_description(parsed_lore),
+                    "rarity": item_data.get('Components', {}).get('rarity', 'COMMON'),
+                    "icon": ICON_MAP.get(item_data.get('material'), 'box'),
+                    "customIcon": custom_texture,
+                    "customModel": custom_model,
+                    "customModelTexture": model_texture,
+                    "parentmodel": parent_model,
+                    "lore": parsed_lore,
+                    "mechanics": get_mechanics(item_data),
+                    "glyph_tags": glyph_tags,
+                    "image": "",
+                    "Pack": item_data.get('Pack', {}),
+                    "Components": item_data.get('Components', {})
+                }
+
+                for cat in categories:
+                    if cat in global_storage:
+                        global_storage[cat].append(item_obj)
+                    elif 'misc' in global_storage:
+                        global_storage['misc'].append(item_obj)
+                converted += 1
+            span_args['count'] = converted
+
+DB_SCHEMA = """
+CREATE TABLE items (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    type TEXT,
+    rarity TEXT,
+    description TEXT,
+    custom_icon TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE item_categories (
+    item_pk INTEGER NOT NULL REFERENCES items(pk),
+    category TEXT NOT NULL,
+    PRIMARY KEY (category, item_pk)
+);
+CREATE TABLE item_lore (
+    item_pk INTEGER NOT NULL REFERENCES items(pk),
+    line INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (item_pk, line)
+);
+CREATE TABLE item_mechanics (
+    item_pk INTEGER NOT NULL REFERENCES items(pk),
+    name TEXT NOT NULL,
+    value TEXT
+);
+CREATE TABLE item_glyph_tags (
+    item_pk INTEGER NOT NULL REFERENCES items(pk),
+    tag TEXT NOT NULL
+);
+CREATE INDEX idx_items_name ON items(name);
+CREATE INDEX idx_items_rarity ON items(rarity);
+CREATE INDEX idx_item_categories_item ON item_categories(item_pk);
+CREATE INDEX idx_item_mechanics_item ON item_mechanics(item_pk);
+CREATE INDEX idx_item_glyph_tags_tag ON item_glyph_tags(tag);
+"""
+
+def write_sqlite(global_storage, db_path=DB_FILE):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(DB_SCHEMA)
+        try:
+            conn.execute("CREATE VIRTUAL TABLE items_fts USING fts5(name, description, lore)")
+            has_fts = True
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 unavailable, search will use LIKE: {e}")
+            has_fts = False
+
+        pks = {}
+        for cat in REQUIRED_CATEGORIES:
+            for item in global_storage.get(cat, []):
+                item_id = item['id']
+                if item_id not in pks:
+                    cur = conn.execute(
+                        "INSERT INTO items (id, name, type, rarity, description, custom_icon, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (item_id, item['name'], item['type'], item['rarity'], item['description'],
+                         item['customIcon'], json.dumps(item, ensure_ascii=False))
+                    )
+                    pk = cur.lastrowid
+                    pks[item_id] = pk
+
+                    lore_lines = [re.sub(r'<[^>]+>', '', line['text']) for line in item['lore']]
+                    conn.executemany("INSERT INTO item_lore (item_pk, line, text) VALUES (?, ?, ?)",
+                                     [(pk, i, text) for i, text in enumerate(lore_lines)])
+                    conn.executemany("INSERT INTO item_mechanics (item_pk, name, value) VALUES (?, ?, ?)",
+                                     [(pk, name, str(value)) for name, value in item['mechanics'].items()])
+                    conn.executemany("INSERT INTO item_glyph_tags (item_pk, tag) VALUES (?, ?)",
+                                     [(pk, tag) for tag in item['glyph_tags']])
+                    if has_fts:
+                        conn.execute("INSERT INTO items_fts (rowid, name, description, lore) VALUES (?, ?, ?, ?)",
+                                     (pk, item['name'], item['description'], "\n".join(lore_lines)))
+
+                conn.execute("INSERT OR IGNORE INTO item_categories (item_pk, category) VALUES (?, ?)",
+                             (pks[item_id], cat))
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    print(f"Generated {db_path} ({len(pks)} items)")
+
+def main(use_sqlite=False):
+    with PROFILER.span('scan_assets', 'generator'):
+        asset_index = scan_assets()
+    print(f"Indexed {len(asset_index)} asset files")
+
     final_json = {cat: [] for cat in REQUIRED_CATEGORIES}
-    process_files(final_json)
+    process_files(final_json, asset_index)
     
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(final_json, f, ensure_ascii=False, indent=2)
+    with PROFILER.span('write_json', 'generator'):
+        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+            json.dump(final_json, f, ensure_ascii=False, indent=2)
     print(f"Generated {OUTPUT_FILE} ({len(final_json)} categories)")
 
+    if use_sqlite:
+        with PROFILER.span('write_sqlite', 'generator'):
+            write_sqlite(final_json)
+    elif os.path.exists(DB_FILE):
+        os.remove(DB_FILE)
+        print(f"Removed stale {DB_FILE}")
+
+    with PROFILER.span('validate_assets', 'generator'):
+        report = validate_assets(final_json, asset_index)
+    with open(ASSET_REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Generated {ASSET_REPORT_FILE} ({len(report['missing'])} missing, {len(report['unused'])} unused)")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sqlite', action='store_true', help=f"also write items to {DB_FILE}")
+    parser.add_argument('--profile', action='store_true', help="write a timing trace to profile/")
+    parser.add_argument('--cprofile', action='store_true', help="also dump cProfile stats (implies --profile)")
+    args = parser.parse_args()
+
+    if args.profile or args.cprofile:
+        PROFILER.enable(args.cprofile)
+
+    with PROFILER.profiled():
+        main(args.sqlite)
+    PROFILER.write()
\ No newline at end of file
@@ -0,0 +1,207 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_DIR = 'profile'
+TRACE_FILE = os.path.join(PROFILE_DIR, 'trace.json')
+TOP_N = 15
+
+SUMMARY_KEYS = ('item', 'items', 'file', 'path')
+
+# from 3.12 cProfile sits on sys.monitoring: one active profiler per process, covering all threads
+SHARED_CPROFILE = sys.version_info >= (3, 12)
+
+class Profiler:
+    def __init__(self, stage):
+        self.stage = stage
+        self.enabled = False
+        self.events = []
+        self.threads = {}
+        self.lock = threading.Lock()
+        self.cprofile = False
+        self._cprofiles = {}
+        self._cprofile_lock = threading.Lock()
+        self._cprofile_active = 0
+
+    def enable(self, cprofile=False):
+        self.enabled = True
+        self.cprofile = cprofile
+
+    @staticmethod
+    def now():
+        return time.time() * 1e6
+
+    def thread_id(self, name=None):
+        if name is None:
+            name = threading.current_thread().name
+        with self.lock:
+            if name not in self.threads:
+                self.threads[name] = len(self.threads) + 1
+            return self.threads[name]
+
+    def add_event(self, name, cat, ts, dur, args=None, thread=None):
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": ts,
+            "dur": dur,
+            "pid": os.getpid(),
+            "tid": self.thread_id(thread),
+            "args": args or {}
+        }
+        with self.lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat, **args):
+        if not self.enabled:
+            yield args
+            return
+
+        ts = self.now()
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add_event(name, cat, ts, (time.perf_counter() - start) * 1e6, args)
+
+    def _start_cprofile(self):
+        key = 'shared' if SHARED_CPROFILE else threading.get_ident()
+        with self._cprofile_lock:
+            profile = self._cprofiles.get(key) or cProfile.Profile()
+            if SHARED_CPROFILE and self._cprofile_active:
+                self._cprofile_active += 1
+                return profile
+            try:
+                profile.enable()
+            except ValueError as e:
+                print(f"cProfile skipped: {e}")
+                return None
+            self._cprofiles[key] = profile
+            if SHARED_CPROFILE:
+                self._cprofile_active = 1
+            return profile
+
+    def _stop_cprofile(self, profile):
+        with self._cprofile_lock:
+            if SHARED_CPROFILE:
+                self._cprofile_active -= 1
+                if self._cprofile_active: return
+            profile.disable()
+
+    @contextmanager
+    def profiled(self):
+        if not self.cprofile:
+            yield
+            return
+
+        profile = self._start_cprofile()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                self._stop_cprofile(profile)
+
+    def summary(self, top_n=TOP_N):
+        with self.lock:
+            events = list(self.events)
+
+        totals = {}
+        for event in events:
+            args = event['args']
+            for key in SUMMARY_KEYS:
+                if key not in args: continue
+
+                values = args[key] if isinstance(args[key], list) else [args[key]]
+                share = event['dur'] / max(1, len(values))
+                for value in values:
+                    entry = totals.setdefault((key.rstrip('s'), value), {"total": 0, "spans": {}})
+                    entry['total'] += share
+                    entry['spans'][event['name']] = entry['spans'].get(event['name'], 0) + share
+                break
+
+        slowest = sorted(totals.items(), key=lambda kv: kv[1]['total'], reverse=True)[:top_n]
+        return [
+            {
+                "kind": kind,
+                "key": value,
+                "total_ms": round(entry['total'] / 1000, 2),
+                "spans_ms": {name: round(dur / 1000, 2) for name, dur in entry['spans'].items()}
+            }
+            for (kind, value), entry in slowest
+        ]
+
+    def write(self, top_n=TOP_N):
+        if not self.enabled:
+            return
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        pid = os.getpid()
+
+        with self.lock:
+            threads = dict(self.threads)
+            events = list(self.events)
+
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": self.stage}}]
+        for name, tid in threads.items():
+            metadata.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+
+        trace_path = os.path.join(PROFILE_DIR, f"{self.stage}.trace.json")
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": metadata + events}, f, ensure_ascii=False)
+
+        slowest = self.summary(top_n)
+        summary_path = os.path.join(PROFILE_DIR, f"{self.stage}.summary.json")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(slowest, f, ensure_ascii=False, indent=2)
+
+        if slowest:
+            print(f"Slowest in {self.stage}:")
+            for entry in slowest:
+                spans = ", ".join(f"{name} {ms}" for name, ms in entry['spans_ms'].items())
+                print(f"  {entry['total_ms']:>10.2f} ms  {entry['kind']} {entry['key']} ({spans})")
+
+        with self._cprofile_lock:
+            profiles = list(self._cprofiles.values())
+            stats = None
+            for profile in profiles:
+                # building stats disables the profile; turn a shared one back on if still in use
+                try:
+                    if stats is None:
+                        stats = pstats.Stats(profile)
+                    else:
+                        stats.add(profile)
+                except TypeError:
+                    continue
+            if SHARED_CPROFILE and self._cprofile_active:
+                profiles[0].enable()
+
+        if stats is not None:
+            prof_path = os.path.join(PROFILE_DIR, f"{self.stage}.prof")
+            stats.dump_stats(prof_path)
+            print(f"Saved {prof_path}")
+
+        print(f"Saved {trace_path}")
+
+def merge_traces(stages, output=TRACE_FILE):
+    events = []
+    for stage in stages:
+        path = os.path.join(PROFILE_DIR, f"{stage}.trace.json")
+        if not os.path.exists(path): continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                events.extend(json.load(f).get('traceEvents', []))
+        except (OSError, ValueError) as e:
+            print(f"Error reading {path}: {e}")
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": events}, f, ensure_ascii=False)
+    print(f"Saved {output} (open in chrome://tracing or ui.perfetto.dev)")
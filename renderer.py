@@ -1,17 +1,34 @@
 import http.server
 import socketserver
+import sqlite3
 import webbrowser
+import argparse
 import json
 import base64
 import os
+import struct
 import sys
 import threading
 import time
+import zlib
+from urllib.parse import urlparse, parse_qs
+
+from profiler import Profiler
 
 PORT = 8090
 ITEMS_FILE = 'items.json'
 OUTPUT_DIR = os.path.join('assets', 'renders')
 RENDER_PAGE = 'render_tool.html'
+PROGRESS_FILE = 'render_progress.jsonl'
+ASSET_REPORT_FILE = 'assets_report.json'
+DB_FILE = 'items.db'
+
+LEASE_SECONDS = 60
+LEASE_CHECK_SECONDS = 5
+MAX_ATTEMPTS = 3
+PROFILER = Profiler('renderer')
+
+GENERIC_PARENTS = ('item/generated', 'item/handheld', 'builtin/generated')
 
 HTML_CONTENT = """<!DOCTYPE html>
 <html lang="en">
@@ -51,6 +68,25 @@ HTML_CONTENT = """<!DOCTYPE html>
     <script>
         let scene, camera, renderer, mesh;
 
+        const PARAMS = new URLSearchParams(location.search);
+        const BATCH_MODE = PARAMS.get('batch') === '1';
+        const TILE_SIZE = 500;
+        const SHEET_COLUMNS = 4;
+        const SHEET_SIZE = TILE_SIZE * SHEET_COLUMNS;
+        const PROFILE = PARAMS.get('profile') === '1';
+        const timings = [];
+
+        async function timed(name, args, fn) {
+            const start = performance.now();
+            try {
+                return await fn();
+            } finally {
+                if (PROFILE) {
+                    timings.push({ name: name, ...args, start: performance.timeOrigin + start, dur: performance.now() - start });
+                }
+            }
+        }
+
         function initScene() {
             scene = new THREE.Scene();
             camera = new THREE.OrthographicCamera(-1, 1, 1, -1, 0.1, 1000);
@@ -69,9 +105,16 @@ HTML_CONTENT = """<!DOCTYPE html>
             renderer = new THREE.WebGLRenderer({ 
                 antialias: true, 
                 alpha: true, 
-                preserveDrawingBuffer: true 
+                preserveDrawingBuffer: !BATCH_MODE 
             });
-            renderer.setSize(500, 500);
+            renderer.setPixelRatio(1);
+            if (BATCH_MODE) {
+                renderer.setSize(SHEET_SIZE, SHEET_SIZE, false);
+                renderer.domElement.style.width = '500px';
+                renderer.domElement.style.height = '500px';
+            } else {
+                renderer.setSize(TILE_SIZE, TILE_SIZE);
+            }
             renderer.setClearColor(0x000000, 0);
             
             document.getElementById('canvas-container').appendChild(renderer.domElement);
@@ -175,39 +218,161 @@ HTML_CONTENT = """<!DOCTYPE html>
                         });
                     }
                     resolve(group);
-                }, undefined, (err) => reject(err));
+                }, undefined, () => reject(loadError(`Texture not found: ${textureUrl}`)));
             });
         }
 
-        async function renderItem(modelPath, texturePath) {
-            let modelData;
+        function loadError(message) {
+            const e = new Error(message);
+            e.permanent = true;
+            return e;
+        }
+
+        function wrapError(prefix, e) {
+            const wrapped = new Error(`${prefix}: ${e.message}`);
+            wrapped.permanent = !!e.permanent;
+            return wrapped;
+        }
+
+        async function loadModel(modelPath) {
+            let response;
+            try {
+                response = await fetch(modelPath);
+            } catch (e) {
+                throw wrapError("Load error", e);
+            }
+            if (!response.ok) throw loadError("Load error: Model not found");
             try {
-                const response = await fetch(modelPath);
-                if (!response.ok) throw new Error("Model not found");
-                modelData = await response.json();
+                return await response.json();
             } catch (e) {
-                throw new Error(`Load error: ${e.message}`);
+                throw loadError(`Load error: ${e.message}`);
             }
+        }
+
+        function disposeMesh(target) {
+            target.traverse((c) => { 
+                if(c.isMesh) { 
+                    if(c.geometry) c.geometry.dispose(); 
+                    if(c.material) {
+                        if(c.material.map) c.material.map.dispose();
+                        c.material.dispose(); 
+                    }
+                }
+            });
+        }
+
+        async function renderItem(itemId, modelPath, texturePath) {
+            const args = { item: itemId };
+            const modelData = await timed('model_fetch', args, () => loadModel(modelPath));
 
             if (mesh) {
                 scene.remove(mesh);
-                mesh.traverse((c) => { 
-                    if(c.isMesh) { 
-                        if(c.geometry) c.geometry.dispose(); 
-                        if(c.material) c.material.dispose(); 
-                    }
-                });
+                disposeMesh(mesh);
             }
 
             try {
-                mesh = await createGeometryFromModel(modelData, texturePath);
+                mesh = await timed('texture_load', args, () => createGeometryFromModel(modelData, texturePath));
                 scene.add(mesh);
                 fitCameraToMesh(mesh);
+                await timed('render', args, () => renderer.render(scene, camera));
+                return await timed('encode', args, () => renderer.domElement.toDataURL('image/png'));
+            } catch (e) {
+                throw wrapError("Three.js error", e);
+            }
+        }
+
+        async function loadJobMesh(job) {
+            const args = { item: job.id };
+            const modelData = await timed('model_fetch', args, () => loadModel(job.model));
+            try {
+                return await timed('texture_load', args, () => createGeometryFromModel(modelData, job.texture));
+            } catch (e) {
+                throw wrapError("Three.js error", e);
+            }
+        }
+
+        function drawSheet(meshes) {
+            renderer.setScissorTest(false);
+            renderer.clear();
+            renderer.setScissorTest(true);
+
+            meshes.forEach((tileMesh, index) => {
+                const x = (index % SHEET_COLUMNS) * TILE_SIZE;
+                const y = (SHEET_COLUMNS - 1 - Math.floor(index / SHEET_COLUMNS)) * TILE_SIZE;
+
+                scene.add(tileMesh);
+                fitCameraToMesh(tileMesh);
+                renderer.setViewport(x, y, TILE_SIZE, TILE_SIZE);
+                renderer.setScissor(x, y, TILE_SIZE, TILE_SIZE);
                 renderer.render(scene, camera);
-                return renderer.domElement.toDataURL('image/png');
+                scene.remove(tileMesh);
+            });
+        }
+
+        function readSheet(height) {
+            // tiles fill the sheet from the top, which is the end of the GL framebuffer
+            const gl = renderer.getContext();
+            const pixels = new Uint8Array(SHEET_SIZE * height * 4);
+            gl.readPixels(0, SHEET_SIZE - height, SHEET_SIZE, height, gl.RGBA, gl.UNSIGNED_BYTE, pixels);
+
+            for (let i = 0; i < pixels.length; i += 4) {
+                const a = pixels[i + 3];
+                if (a > 0 && a < 255) {
+                    pixels[i] = Math.min(255, Math.round(pixels[i] * 255 / a));
+                    pixels[i + 1] = Math.min(255, Math.round(pixels[i + 1] * 255 / a));
+                    pixels[i + 2] = Math.min(255, Math.round(pixels[i + 2] * 255 / a));
+                }
+            }
+            return pixels;
+        }
+
+        async function renderJobSheet(jobs) {
+            const loaded = await Promise.allSettled(jobs.map(loadJobMesh));
+            const results = [];
+            const tiles = [];
+
+            loaded.forEach((entry, index) => {
+                const job = jobs[index];
+                if (entry.status === 'fulfilled') {
+                    tiles.push({ job: job, mesh: entry.value });
+                } else {
+                    log(`[${job.id}] Error: ${entry.reason.message}`, "error");
+                    results.push({ id: job.id, status: 'error', error: entry.reason.message, retry: !entry.reason.permanent });
+                }
+            });
+
+            if (!tiles.length) return results;
+
+            try {
+                const ids = tiles.map(t => t.job.id);
+                const args = { items: ids };
+                await timed('render', args, () => drawSheet(tiles.map(t => t.mesh)));
+                const height = Math.ceil(tiles.length / SHEET_COLUMNS) * TILE_SIZE;
+                const pixels = await timed('encode', args, () => readSheet(height));
+                const query = new URLSearchParams({
+                    tile: TILE_SIZE,
+                    columns: SHEET_COLUMNS,
+                    width: SHEET_SIZE,
+                    height: height,
+                    ids: JSON.stringify(ids)
+                });
+                const res = await timed('upload', args, () =>
+                    fetch(`/upload_sheet?${query}`, { method: 'POST', body: pixels }).then(r => r.json()));
+                if (res.status !== 'ok') throw new Error("Upload failed");
+
+                tiles.forEach(t => {
+                    log(`[${t.job.id}] Success`, "success");
+                    results.push({ id: t.job.id, status: 'ok', path: res.paths[t.job.id] });
+                });
             } catch (e) {
-                throw new Error(`Three.js error: ${e.message}`);
+                tiles.forEach(t => {
+                    log(`[${t.job.id}] Error: ${e.message}`, "error");
+                    results.push({ id: t.job.id, status: 'error', error: e.message });
+                });
+            } finally {
+                tiles.forEach(t => disposeMesh(t.mesh));
             }
+            return results;
         }
 
         const log = (msg, type='normal') => {
@@ -219,77 +384,89 @@ HTML_CONTENT = """<!DOCTYPE html>
 
         const updateStatus = (text, percent) => {
             document.getElementById('status').textContent = text;
-            document.getElementById('bar').style.width = percent + '%';
+            if (percent !== null) document.getElementById('bar').style.width = percent + '%';
         };
 
-        function resolveModelPath(item) {
-            const parent = item.parentmodel;
-            if (parent && !parent.includes('minecraft:item/generated') && !parent.includes('minecraft:item/handheld') && !parent.includes('builtin/generated')) {
-                return parent;
-            }
-            return item.customModel;
+        const CLIENT_ID = new URLSearchParams(location.search).get('client') || Math.random().toString(36).slice(2, 10);
+        const JOB_BATCH = BATCH_MODE ? SHEET_COLUMNS * SHEET_COLUMNS : 4;
+
+        const postJson = (url, body) => fetch(url, {
+            method: 'POST',
+            body: JSON.stringify(body)
+        }).then(r => r.json());
+
+        function updateProgress(stats) {
+            const finished = stats.done + stats.failed;
+            const percent = stats.total ? (finished / stats.total) * 100 : 100;
+            updateStatus(`[${CLIENT_ID}] ${finished}/${stats.total} (leased: ${stats.leased})`, percent);
         }
 
-        async function startBatchProcess() {
-            initScene();
-            log("Loading items.json...");
-            let itemsData;
+        async function renderJob(job) {
             try {
-                itemsData = await fetch('items.json').then(r => r.json());
-            } catch(e) {
-                log("Failed to load items.json", "error");
-                return;
+                const base64Image = await renderItem(job.id, job.model, job.texture);
+                const res = await timed('upload', { item: job.id }, () =>
+                    postJson('/upload_image', { id: job.id, image: base64Image }));
+                if (res.status !== 'ok') throw new Error("Upload failed");
+                log(`[${job.id}] Success`, "success");
+                return { id: job.id, status: 'ok', path: res.path };
+            } catch (e) {
+                log(`[${job.id}] Error: ${e.message}`, "error");
+                return { id: job.id, status: 'error', error: e.message, retry: !e.permanent };
             }
+        }
 
-            let queue = [];
-            for (let cat in itemsData) {
-                itemsData[cat].forEach(item => {
-                    queue.push({ category: cat, item: item });
-                });
+        async function reportResults(results) {
+            try {
+                const res = await postJson('/complete', { client: CLIENT_ID, results: results, timings: timings.splice(0) });
+                updateProgress(res.stats);
+            } catch (e) {
+                log(`Failed to report results: ${e.message}`, "error");
             }
+        }
 
-            let total = queue.length;
-            let processed = 0;
+        async function startWorker() {
+            initScene();
+            log(`Client ${CLIENT_ID} started`);
 
-            for (let entry of queue) {
-                const item = entry.item;
-                processed++;
-                updateStatus(`Processing ${processed}/${total}: ${item.name}`, (processed/total)*100);
+            let failures = 0;
+            while (true) {
+                let batch;
+                try {
+                    batch = await postJson('/next_jobs', { client: CLIENT_ID, count: JOB_BATCH });
+                    failures = 0;
+                } catch (e) {
+                    if (++failures >= 5) {
+                        log("Render server unavailable", "error");
+                        return;
+                    }
+                    await new Promise(r => setTimeout(r, 2000));
+                    continue;
+                }
+                updateProgress(batch.stats);
 
-                const modelPath = resolveModelPath(item);
-                const texturePath = item.customModelTexture;
+                if (batch.done) break;
+                if (!batch.jobs.length) {
+                    await new Promise(r => setTimeout(r, 1000));
+                    continue;
+                }
 
-                if (!modelPath || !texturePath) {
-                    log(`[${item.id}] Skipped (missing paths)`, "skip");
+                if (BATCH_MODE) {
+                    updateStatus(`[${CLIENT_ID}] Rendering sheet of ${batch.jobs.length}`, null);
+                    await reportResults(await renderJobSheet(batch.jobs));
                     continue;
                 }
 
-                try {
-                    const base64Image = await renderItem(modelPath, texturePath);
-                    const res = await fetch('/upload_image', {
-                        method: 'POST',
-                        body: JSON.stringify({ id: item.id, image: base64Image })
-                    }).then(r => r.json());
-
-                    if (res.status === 'ok') {
-                        item.customIcon = res.path;
-                        log(`[${item.id}] Success`, "success");
-                    }
-                } catch (e) {
-                    log(`[${item.id}] Error: ${e.message}`, "error");
+                for (let job of batch.jobs) {
+                    updateStatus(`[${CLIENT_ID}] Processing: ${job.name}`, null);
+                    await reportResults([await renderJob(job)]);
+                    await new Promise(r => setTimeout(r, 50));
                 }
-                await new Promise(r => setTimeout(r, 50));
             }
 
-            updateStatus("Saving...", 100);
-            await fetch('/save_json', {
-                method: 'POST',
-                body: JSON.stringify({ items: itemsData })
-            });
             document.getElementById('status').textContent = `Done`;
         }
 
-        window.onload = startBatchProcess;
+        window.onload = startWorker;
     </script>
 </body>
 </html>
@@ -301,12 +478,309 @@ if not os.path.exists(OUTPUT_DIR):
 with open(RENDER_PAGE, 'w', encoding='utf-8') as f:
     f.write(HTML_CONTENT)
 
+def resolve_model_path(item):
+    parent = item.get('parentmodel')
+    if parent and not any(p in parent for p in GENERIC_PARENTS):
+        return parent
+    return item.get('customModel')
+
+def load_missing_assets(report_path=ASSET_REPORT_FILE):
+    if not os.path.exists(report_path):
+        return set()
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {report_path}: {e}")
+        return set()
+    return {entry['path'] for key in ('missing', 'unresolved_vanilla') for entry in report.get(key, [])}
+
+def update_item_db(icons, db_path=DB_FILE):
+    print(f"Updating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany(
+            "UPDATE items SET custom_icon = ?, data = json_set(data, '$.customIcon', ?) WHERE id = ?",
+            [(path, path, item_id) for item_id, path in icons.items()]
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error updating {db_path}: {e}")
+    finally:
+        conn.close()
+
+class RenderQueue:
+    def __init__(self, items_data, progress_file=PROGRESS_FILE, missing_assets=()):
+        self.items_data = items_data
+        self.progress_file = progress_file
+        self.lock = threading.Lock()
+        self.log_lock = threading.Lock()
+        self.jobs = {}
+        self.skipped = []
+        self.missing = []
+        self.finalized = False
+        self._unsaved = []
+
+        progress = {}
+        if os.path.exists(progress_file):
+            with open(progress_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    progress[entry['id']] = entry
+        self.progress_log = open(progress_file, 'a', encoding='utf-8')
+
+        for cat_items in items_data.values():
+            for item in cat_items:
+                item_id = item['id']
+                if item_id in self.jobs or item_id in self.skipped: continue
+
+                model_path = resolve_model_path(item)
+                texture_path = item.get('customModelTexture')
+                if not model_path or not texture_path:
+                    self.skipped.append(item_id)
+                    continue
+                if model_path in missing_assets or texture_path in missing_assets:
+                    self.missing.append(item_id)
+                    continue
+
+                job = {
+                    "id": item_id,
+                    "name": item.get('name', item_id),
+                    "model": model_path,
+                    "texture": texture_path,
+                    "state": "pending",
+                    "attempts": 0,
+                    "client": None,
+                    "expires": 0,
+                    "path": None,
+                    "error": None
+                }
+                if item_id in progress:
+                    job['state'] = progress[item_id]['state']
+                    job['path'] = progress[item_id].get('path')
+                    job['error'] = progress[item_id].get('error')
+                self.jobs[item_id] = job
+
+    def _fail_or_retry(self, job, error, retry=True):
+        job['client'] = None
+        job['error'] = error
+        if retry and job['attempts'] < MAX_ATTEMPTS:
+            job['state'] = 'pending'
+        else:
+            job['state'] = 'failed'
+            self._unsaved.append({"id": job['id'], "state": "failed", "error": error})
+
+    def _reclaim_expired(self):
+        now = time.time()
+        reclaimed = False
+        for job in self.jobs.values():
+            if job['state'] == 'leased' and job['expires'] < now:
+                print(f"Lease expired: {job['id']} (client {job['client']})")
+                self._fail_or_retry(job, "Lease timeout")
+                reclaimed = True
+        return reclaimed
+
+    def stats(self):
+        counts = {"total": len(self.jobs), "pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for job in self.jobs.values():
+            counts[job['state']] += 1
+        return counts
+
+    def is_finished(self):
+        return all(job['state'] in ('done', 'failed') for job in self.jobs.values())
+
+    def reclaim_expired(self):
+        with self.lock:
+            self._reclaim_expired()
+        self.save_progress()
+
+    def next_jobs(self, client, count):
+        with self.lock:
+            self._reclaim_expired()
+            leased = []
+            expires = time.time() + LEASE_SECONDS
+            for job in self.jobs.values():
+                if len(leased) >= count: break
+                if job['state'] != 'pending': continue
+                job['state'] = 'leased'
+                job['attempts'] += 1
+                job['client'] = client
+                job['expires'] = expires
+                leased.append({k: job[k] for k in ('id', 'name', 'model', 'texture', 'attempts')})
+        self.save_progress()
+        return leased
+
+    def complete(self, client, results):
+        with self.lock:
+            for result in results:
+                job = self.jobs.get(result.get('id'))
+                if not job or job['state'] in ('done', 'failed'): continue
+
+                # a stale client may still report a finished render, but never a failure
+                is_holder = job['state'] == 'leased' and job['client'] == client
+                if result.get('status') == 'ok':
+                    job['state'] = 'done'
+                    job['path'] = result.get('path')
+                    job['error'] = None
+                    job['client'] = None
+                    self._unsaved.append({"id": job['id'], "state": "done", "path": job['path']})
+                elif is_holder:
+                    self._fail_or_retry(job, result.get('error') or "Unknown error", result.get('retry', True))
+                    if job['state'] == 'failed':
+                        print(f"Failed: {job['id']} ({job['error']})")
+        self.save_progress()
+
+    def save_progress(self):
+        with self.lock:
+            entries, self._unsaved = self._unsaved, []
+        if not entries:
+            return
+
+        with self.log_lock:
+            if self.progress_log.closed: return
+            for entry in entries:
+                self.progress_log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.progress_log.flush()
+
+    def finalize(self):
+        with self.lock:
+            if self.finalized or not self.is_finished():
+                return False
+            self.finalized = True
+
+            for cat_items in self.items_data.values():
+                for item in cat_items:
+                    job = self.jobs.get(item['id'])
+                    if job and job['state'] == 'done' and job['path']:
+                        item['customIcon'] = job['path']
+
+            print("Updating items.json...")
+            with open(ITEMS_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self.items_data, f, ensure_ascii=False, indent=2)
+
+            if os.path.exists(DB_FILE):
+                update_item_db({job['id']: job['path'] for job in self.jobs.values() if job['state'] == 'done' and job['path']})
+
+            with self.log_lock:
+                self.progress_log.close()
+            if os.path.exists(self.progress_file):
+                os.remove(self.progress_file)
+
+            stats = self.stats()
+            print(f"Complete ({stats['done']} rendered, {stats['failed']} failed, "
+                  f"{len(self.skipped)} skipped, {len(self.missing)} missing assets)")
+            return True
+
+def save_render(item_id, png_bytes):
+    file_name = f"{item_id}.png"
+    file_path = os.path.join(OUTPUT_DIR, file_name)
+
+    with open(file_path, 'wb') as f:
+        f.write(png_bytes)
+
+    print(f"Saved: {file_name}")
+    return f"assets/renders/{file_name}"
+
+def encode_png(width, height, rows):
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    raw = b''.join(b'\x00' + row for row in rows)
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 6))
+            + chunk(b'IEND', b''))
+
+def slice_sheet(pixels, width, height, tile, columns, ids):
+    # pixels come from gl.readPixels: RGBA, rows ordered bottom-up
+    stride = width * 4
+    row_bytes = tile * 4
+    paths = {}
+
+    for index, item_id in enumerate(ids):
+        col = index % columns
+        row = index // columns
+        left = col * row_bytes
+
+        rows = []
+        for y in range(row * tile, (row + 1) * tile):
+            start = (height - 1 - y) * stride + left
+            rows.append(pixels[start:start + row_bytes])
+
+        with PROFILER.span('save_tile', 'render-server', item=item_id):
+            paths[item_id] = save_render(item_id, encode_png(tile, tile, rows))
+
+    return paths
+
+class RenderServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+def record_client_timings(client, timings):
+    thread = f"client {client}"
+    for timing in timings:
+        args = {k: v for k, v in timing.items() if k not in ('name', 'start', 'dur')}
+        PROFILER.add_event(timing.get('name', 'unknown'), 'render-client',
+                           timing.get('start', 0) * 1000, timing.get('dur', 0) * 1000, args, thread)
+
+def finish_if_done(queue):
+    if queue.finalize():
+        PROFILER.write()
+        shutdown_later()
+
+def watch_leases(queue):
+    def watch():
+        while True:
+            time.sleep(LEASE_CHECK_SECONDS)
+            queue.reclaim_expired()
+            finish_if_done(queue)
+    threading.Thread(target=watch, daemon=True).start()
+
+def shutdown_later():
+    def shutdown():
+        time.sleep(2)
+        print("Server stopped(render)")
+        os._exit(0)
+    threading.Thread(target=shutdown).start()
+
 class RenderRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def send_json(self, response):
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(response).encode('utf-8'))
+
+    def handle_sheet(self, query, pixels):
+        width = int(query['width'][0])
+        height = int(query['height'][0])
+        tile = int(query['tile'][0])
+        columns = int(query['columns'][0])
+        ids = json.loads(query['ids'][0])
+
+        if len(pixels) != width * height * 4:
+            self.send_error(400, "Sheet size mismatch")
+            return
+        if tile * columns > width or tile * ((len(ids) + columns - 1) // columns) > height:
+            self.send_error(400, "Tiles out of bounds")
+            return
+
+        with PROFILER.profiled():
+            paths = slice_sheet(pixels, width, height, tile, columns, ids)
+        self.send_json({"status": "ok", "paths": paths})
+
     def do_POST(self):
         content_length = int(self.headers['Content-Length'])
         post_data = self.rfile.read(content_length)
+        url = urlparse(self.path)
         
         try:
+            if url.path == '/upload_sheet':
+                self.handle_sheet(parse_qs(url.query), post_data)
+                return
+
             data = json.loads(post_data.decode('utf-8'))
             
             if self.path == '/upload_image':
@@ -316,35 +790,22 @@ class RenderRequestHandler(http.server.SimpleHTTPRequestHandler):
                 if ',' in image_b64:
                     image_b64 = image_b64.split(',')[1]
                 
-                file_name = f"{item_id}.png"
-                file_path = os.path.join(OUTPUT_DIR, file_name)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(base64.b64decode(image_b64))
-                
-                print(f"Saved: {file_name}")
-                
-                response = {"status": "ok", "path": f"assets/renders/{file_name}"}
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode('utf-8'))
-
-            elif self.path == '/save_json':
-                updated_items = data.get('items')
-                print("Updating items.json...")
-                with open(ITEMS_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(updated_items, f, ensure_ascii=False, indent=2)
-                
-                print("Complete")
-                self.send_response(200)
-                self.end_headers()
-                
-                def shutdown():
-                    time.sleep(2)
-                    print("Server stopped(render)")
-                    os._exit(0)
-                threading.Thread(target=shutdown).start()
+                with PROFILER.span('save_image', 'render-server', item=item_id), PROFILER.profiled():
+                    path = save_render(item_id, base64.b64decode(image_b64))
+                self.send_json({"status": "ok", "path": path})
+
+            elif self.path == '/next_jobs':
+                queue = self.server.queue
+                jobs = queue.next_jobs(data.get('client'), max(1, int(data.get('count', 1))))
+                self.send_json({"jobs": jobs, "done": queue.is_finished(), "stats": queue.stats()})
+                finish_if_done(queue)
+
+            elif self.path == '/complete':
+                queue = self.server.queue
+                queue.complete(data.get('client'), data.get('results', []))
+                record_client_timings(data.get('client'), data.get('timings', []))
+                self.send_json({"status": "ok", "stats": queue.stats()})
+                finish_if_done(queue)
 
             else:
                 self.send_error(404, "Unknown endpoint")
@@ -357,24 +818,52 @@ class RenderRequestHandler(http.server.SimpleHTTPRequestHandler):
         if "POST" in args[0]:
              sys.stderr.write("%s [%s] %s\n" % (self.client_address[0], self.log_date_time_string(), format%args))
 
-def run_server():
+def run_server(clients=1, batch=False, profile=False):
     print(f"Render output: {OUTPUT_DIR}")
 
-    with socketserver.TCPServer(("", PORT), RenderRequestHandler) as httpd:
-        url = f"http://localhost:{PORT}/{RENDER_PAGE}"
-        print(f"Opening {url}")
-        
-        webbrowser.open(url)
+    with open(ITEMS_FILE, 'r', encoding='utf-8') as f:
+        queue = RenderQueue(json.load(f), missing_assets=load_missing_assets())
+
+    stats = queue.stats()
+    print(f"Render jobs: {stats['total']} ({stats['done'] + stats['failed']} resumed, "
+          f"{len(queue.skipped)} skipped, {len(queue.missing)} with missing assets)")
+    if queue.finalize():
+        PROFILER.write()
+        return
+
+    with RenderServer(("", PORT), RenderRequestHandler) as httpd:
+        httpd.queue = queue
+        watch_leases(queue)
+
+        for i in range(clients):
+            url = f"http://localhost:{PORT}/{RENDER_PAGE}?client={i + 1}"
+            if batch:
+                url += "&batch=1"
+            if profile:
+                url += "&profile=1"
+            print(f"Opening {url}")
+            webbrowser.open(url, new=2)
         
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\nStopped.")
+            PROFILER.write()
             sys.exit(0)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=1, help="number of browser tabs to open")
+    parser.add_argument('--batch', action='store_true', help="render icons in tiled sheets")
+    parser.add_argument('--profile', action='store_true', help="write a timing trace to profile/")
+    parser.add_argument('--cprofile', action='store_true', help="also dump cProfile stats (implies --profile)")
+    args = parser.parse_args()
+
+    if args.profile or args.cprofile:
+        PROFILER.enable(args.cprofile)
+
     if not os.path.exists(ITEMS_FILE):
         print(f"Error: {ITEMS_FILE} not found")
         sys.exit(1)
     
-    run_server()
\ No newline at end of file
+    run_server(max(1, args.clients), args.batch, PROFILER.enabled)
\ No newline at end of file
@@ -2,19 +2,146 @@ import http.server
 import socketserver
 import subprocess
 import webbrowser
+import argparse
+import json
+import re
+import sqlite3
 import sys
 import os
 import time
+from urllib.parse import urlparse, parse_qs, unquote
+
+from profiler import Profiler, PROFILE_DIR, merge_traces
 
 PORT = 8000
 NEXO_GENERATOR = "nexo-items.py"
 RENDERER_SCRIPT = "renderer.py"
 HTML_FILE = "wiki-copy.html"
+DB_FILE = "items.db"
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_MAX_PAGE = 1000000
+
+PROFILER = Profiler('start_wiki')
+PROFILE_STAGES = ['nexo-items', 'renderer', 'start_wiki']
 
 class ReuseAddrTCPServer(socketserver.TCPServer):
     allow_reuse_address = True
 
-def run_script(script_name):
+def fts_query(text):
+    tokens = re.findall(r'\w+', text)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class WikiRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def handle_one_request(self):
+        self.command = None
+        ts = PROFILER.now()
+        start = time.perf_counter()
+
+        with PROFILER.profiled():
+            super().handle_one_request()
+
+        if self.command:
+            path = urlparse(self.path).path
+            PROFILER.add_event(f"{self.command} {path}", 'http', ts, (time.perf_counter() - start) * 1e6,
+                               {"path": path})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == '/api/items':
+            self.handle_api(self.api_items, parse_qs(url.query))
+        elif url.path.startswith('/api/item/'):
+            self.handle_api(self.api_item, unquote(url.path[len('/api/item/'):]))
+        else:
+            super().do_GET()
+
+    def send_json(self, status, response):
+        body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_api(self, handler, arg):
+        if not os.path.exists(DB_FILE):
+            self.send_json(503, {"error": f"{DB_FILE} not found, run {NEXO_GENERATOR} --sqlite"})
+            return
+
+        conn = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True)
+        try:
+            self.send_json(200, handler(conn, arg))
+        except ApiError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            self.send_json(500, {"error": "Database error"})
+        finally:
+            conn.close()
+
+    def api_items(self, conn, query):
+        category = query.get('category', [''])[0]
+        text = query.get('q', [''])[0].strip()
+        try:
+            page = min(API_MAX_PAGE, max(1, int(query.get('page', ['1'])[0])))
+            per_page = min(API_MAX_PAGE_SIZE, max(1, int(query.get('per_page', [API_PAGE_SIZE])[0])))
+        except ValueError:
+            raise ApiError(400, "page and per_page must be integers")
+
+        joins = ""
+        where = []
+        params = []
+
+        if category:
+            joins = "JOIN item_categories c ON c.item_pk = i.pk"
+            where.append("c.category = ?")
+            params.append(category)
+
+        if text:
+            has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_fts'").fetchone()
+            match = fts_query(text)
+            if has_fts and match:
+                where.append("i.pk IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+                params.append(match)
+            else:
+                pattern = "%" + re.sub(r'([\\%_])', r'\\\1', text) + "%"
+                where.append("(i.name LIKE ? ESCAPE '\\' OR i.description LIKE ? ESCAPE '\\')")
+                params += [pattern, pattern]
+
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM items i {joins} {where_sql}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT i.data FROM items i {joins} {where_sql} ORDER BY i.pk LIMIT ? OFFSET ?",
+            params + [per_page, (page - 1) * per_page]
+        ).fetchall()
+
+        return {
+            "items": [json.loads(row[0]) for row in rows],
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "pages": (total + per_page - 1) // per_page
+        }
+
+    def api_item(self, conn, item_id):
+        row = conn.execute("SELECT pk, data FROM items WHERE id = ?", (item_id,)).fetchone()
+        if not row:
+            raise ApiError(404, f"Item {item_id} not found")
+
+        item = json.loads(row[1])
+        item['categories'] = [r[0] for r in conn.execute(
+            "SELECT category FROM item_categories WHERE item_pk = ? ORDER BY category", (row[0],)
+        )]
+        return item
+
+def run_script(script_name, args=()):
     print(f"Running {script_name}...")
     
     if not os.path.exists(script_name):
@@ -22,11 +149,12 @@ def run_script(script_name):
         return False
 
     try:
-        subprocess.run(
-            [sys.executable, script_name], 
-            check=True,
-            text=True
-        )
+        with PROFILER.span(f"run {script_name}", 'stage'):
+            subprocess.run(
+                [sys.executable, script_name, *args], 
+                check=True,
+                text=True
+            )
         return True
     except subprocess.CalledProcessError as e:
         print(f"Error executing {script_name}: code {e.returncode}")
@@ -39,7 +167,7 @@ def start_wiki_server():
     if not os.path.exists(HTML_FILE):
         print(f"Warning: {HTML_FILE} missing")
 
-    handler = http.server.SimpleHTTPRequestHandler
+    handler = WikiRequestHandler
     
     try:
         with ReuseAddrTCPServer(("", PORT), handler) as httpd:
@@ -55,10 +183,31 @@ def start_wiki_server():
         print(f"Server error: {e}")
 
 if __name__ == "__main__":
-    if run_script(NEXO_GENERATOR):
-        if run_script(RENDERER_SCRIPT):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sqlite', action='store_true', help=f"build {DB_FILE} and serve /api endpoints from it")
+    parser.add_argument('--profile', action='store_true', help=f"write timing traces for every stage to {PROFILE_DIR}/")
+    parser.add_argument('--cprofile', action='store_true', help="also dump cProfile stats (implies --profile)")
+    args = parser.parse_args()
+
+    generator_args = ['--sqlite'] if args.sqlite else []
+    profile_args = []
+    if args.profile or args.cprofile:
+        PROFILER.enable(args.cprofile)
+        profile_args = ['--cprofile'] if args.cprofile else ['--profile']
+
+        for stage in PROFILE_STAGES:
+            stale = os.path.join(PROFILE_DIR, f"{stage}.trace.json")
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    if run_script(NEXO_GENERATOR, generator_args + profile_args):
+        if run_script(RENDERER_SCRIPT, profile_args):
             start_wiki_server()
         else:
             print("Renderer script failed")
     else:
-        print("Generator script failed")
\ No newline at end of file
+        print("Generator script failed")
+
+    if PROFILER.enabled:
+        PROFILER.write()
+        merge_traces(PROFILE_STAGES)
\ No newline at end of file